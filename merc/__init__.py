@@ -1,7 +1,13 @@
 # pylint: disable=missing-module-docstring
 # pylint: disable=unused-import
 
-from .run_process import RunProcess, TimeExceededError, MemoryExceededError, ToolNotFoundError
+from .run_process import (
+    RunProcess,
+    TimeExceededError,
+    MemoryExceededError,
+    ToolNotFoundError,
+    ToolRuntimeError,
+)
 from .logger import MercLogger
 
 # This is used to avoid unused-import warnings
@@ -10,5 +16,6 @@ __all__ = [
     "TimeExceededError",
     "MemoryExceededError",
     "ToolNotFoundError",
+    "ToolRuntimeError",
     "MercLogger",
 ]
\ No newline at end of file
@@ -1,31 +1,94 @@
 import logging
 import sys
-from io import StringIO
+from collections import deque
 
-formatter = logging.Formatter("%(threadName)-11s %(asctime)s %(levelname)s %(message)s")
+class MercFormatter(logging.Formatter):
+    """Formatter that caches the padded thread name per thread and uses a fixed
+    datefmt, which skips the millisecond formatting branch of the default asctime"""
+
+    def __init__(self):
+        logging.Formatter.__init__(
+            self,
+            "%(threadName)s %(asctime)s %(levelname)s %(message)s",
+            datefmt="%H:%M:%S",
+        )
+        self._padded: dict[str, str] = {}
+
+    def format(self, record):
+        padded = self._padded.get(record.threadName)
+        if padded is None:
+            padded = record.threadName.ljust(11)
+            self._padded[record.threadName] = padded
+        record.threadName = padded
+
+        return logging.Formatter.format(self, record)
+
+
+formatter = MercFormatter()
 logging.basicConfig(level=logging.DEBUG)
 
+
+class MercHandler(logging.Handler):
+    """Handler that formats each record once and fans the result out to a deque of
+    chunks and every registered stream, instead of formatting per handler"""
+
+    def __init__(self, terminator: str = "\n", maxlen: int | None = None):
+        """Create a new handler, optionally bounding retention to maxlen records"""
+        logging.Handler.__init__(self)
+
+        self.terminator = terminator
+        self.streams = [sys.stderr]
+        # Streams opened on our behalf, closed again in close()
+        self.owned_streams = []
+        self._chunks: deque[str] = deque(maxlen=maxlen)
+        self._value: str | None = None
+
+    def handle(self, record):
+        # Skip the per-handler lock of logging.Handler.handle; appending to the
+        # deque is atomic and the streams are line buffered.
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        message = self.format(record) + self.terminator
+        self._chunks.append(message)
+        self._value = None
+
+        for stream in self.streams:
+            stream.write(message)
+            stream.flush()
+
+    def getvalue(self) -> str:
+        """Returns the logged records joined into a single str"""
+        if self._value is None:
+            self._value = "".join(self._chunks)
+        return self._value
+
+    def close(self):
+        """Close the streams this handler opened; Handler.__init__ registered us
+        for logging.shutdown(), so the log file is closed at interpreter exit"""
+        for stream in self.owned_streams:
+            stream.close()
+        logging.Handler.close(self)
+
+
 class MercLogger(logging.Logger):
-    """My own logger that stores the log messages into a string stream"""
+    """My own logger that stores the log messages into a string buffer"""
 
     def __init__(self, filename: str | None = None, terminator="\n"):
         """Create a new logger instance with the given name"""
         logging.Logger.__init__(self, "MercLogger", logging.DEBUG)
 
-        self.stream = StringIO()
-        handler = logging.StreamHandler(self.stream)
-        handler.terminator = terminator
-        handler.setFormatter(formatter)
+        self._handler = MercHandler(terminator)
+        self._handler.setFormatter(formatter)
 
         if filename is not None:
-            self.addHandler(logging.FileHandler(filename))
-
-        standard_output = logging.StreamHandler(sys.stderr)
-        standard_output.terminator = terminator
+            stream = open(filename, "a", encoding="utf-8")
+            self._handler.streams.append(stream)
+            self._handler.owned_streams.append(stream)
 
-        self.addHandler(handler)
-        self.addHandler(standard_output)
+        self.addHandler(self._handler)
 
     def getvalue(self) -> str:
         """Returns the str that has been logged to this logger"""
-        return self.stream.getvalue()
\ No newline at end of file
+        return self._handler.getvalue()
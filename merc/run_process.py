@@ -4,21 +4,79 @@
 # pylint: disable=missing-docstring
 # pylint: disable=line-too-long
 
-import subprocess
+import atexit
 import concurrent.futures
+import functools
+import os
+import selectors
+import shutil
+import signal
+import subprocess
 import sys
+import threading
 import time
 
+if sys.platform == "linux":
+    import resource
+
 from typing import Callable
 
 import psutil
 
 
+@functools.lru_cache(maxsize=128)
+def _resolve(tool: str) -> str | None:
+    """Resolve the tool name to an absolute path, caching the PATH search"""
+    return shutil.which(tool)
+
+
 class RunProcess:
     stdout = ""
     stderr = ""
     returncode = -1
 
+    # Shared pool of monitoring threads, created on first use and reused by every
+    # RunProcess call to avoid spawning a fresh thread per invocation.
+    _monitor_pool: concurrent.futures.ThreadPoolExecutor | None = None
+    _monitor_workers = 8
+    _monitor_active = 0
+    _monitor_lock = threading.Lock()
+
+    @classmethod
+    def _get_pool(cls) -> concurrent.futures.ThreadPoolExecutor:
+        """Returns the shared monitoring thread pool, creating it on first use"""
+        if cls._monitor_pool is None:
+            cls._monitor_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=cls._monitor_workers, thread_name_prefix="merc-monitor"
+            )
+            atexit.register(cls._monitor_pool.shutdown)
+        return cls._monitor_pool
+
+    @classmethod
+    def _start_monitor(cls, target, proc) -> Callable[[], None]:
+        """Start the monitor on the shared pool, or on a dedicated daemon thread
+        when every pool worker is busy, so a queued task can never leave a tool
+        running unmonitored. Returns a callable that waits for the monitor."""
+
+        with cls._monitor_lock:
+            cls._monitor_active += 1
+            saturated = cls._monitor_active > cls._monitor_workers
+
+        def run():
+            try:
+                target(proc)
+            finally:
+                with cls._monitor_lock:
+                    cls._monitor_active -= 1
+
+        if saturated:
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            return thread.join
+
+        future = cls._get_pool().submit(run)
+        return future.result
+
     def __init__(
         self,
         tool: str,
@@ -32,74 +90,240 @@ class RunProcess:
         Run the process tool with the given arguments, using at most max_memory MB of resident set memory, and max_time seconds
         """
 
+        if max_time == sys.maxsize and max_memory == sys.maxsize and read_stdout is None:
+            # Nothing to read and nothing to enforce: run the tool directly and
+            # skip the pipe, the monitoring thread and the sampling loop.
+            before = time.perf_counter()
+            try:
+                result = subprocess.run(
+                    [_resolve(tool) or tool] + arguments,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.STDOUT,
+                    env=env,
+                    check=False,
+                )
+            except FileNotFoundError as e:
+                raise ToolNotFoundError(tool) from e
+
+            self._time_used = time.perf_counter() - before
+            self._max_rss_bytes = 0
+
+            if result.returncode != 0:
+                raise ToolRuntimeError(
+                    f"Tool {tool} {arguments} ended with return code {result.returncode}"
+                )
+            return
+
         try:
+            # Resolve the tool to an absolute path once (cached in _resolve), so
+            # the exec in the child does not walk every PATH entry on each launch.
+            path = _resolve(tool) or tool
+
             # Use a separate timer to measure user time
             before = time.perf_counter()
             with subprocess.Popen(
-                [tool] + arguments,
+                [path] + arguments,
                 # Merge stderr and stdout into one, so we don't have to handle both streams in separate threads.
-                stdout=subprocess.PIPE,
+                # Without a callback the output is discarded by the kernel, which
+                # skips the pipe allocation and the reader loop entirely.
+                stdout=subprocess.PIPE if read_stdout else subprocess.DEVNULL,
                 stderr=subprocess.STDOUT,
                 # Pass the environment
                 env=env,
-                # 1 means line buffered (only usable if text=True or universal_newlines=True)
-                text=True,
-                bufsize=1,
+                # Read the stream in binary mode with full block buffering; lines are
+                # split in batches below, which is much cheaper than line buffering.
+                bufsize=-1,
+                # Give the tool its own session (and process group) so the whole
+                # tree can be killed with a single signal in kill_all.
+                start_new_session=True,
             ) as proc:
                 self._time_used = 0
-                self._max_memory_used = 0
+                self._max_rss_bytes = 0
+
+                # Ask the kernel to enforce the CPU-time budget as well, so a tool
+                # that burns CPU between two samples cannot overshoot. Memory stays
+                # with the sampling thread: an RLIMIT_AS ceiling would make the
+                # tool fail its own allocations (address space exceeds the resident
+                # set), turning memory overruns into ToolRuntimeError instead of
+                # MemoryExceededError. RLIMIT_CPU counts CPU time rather than wall
+                # time, so the monitoring thread below still enforces wall time.
+                if sys.platform == "linux" and max_time != sys.maxsize:
+                    try:
+                        # Keep the hard limit above the soft one so the tool dies
+                        # from SIGXCPU, which we can tell apart from other signals.
+                        resource.prlimit(
+                            proc.pid, resource.RLIMIT_CPU, (max_time, max_time + 1)
+                        )
+                    except ProcessLookupError:
+                        # The tool finished before the limit could be applied
+                        pass
+
+                # Set by the main thread as soon as the process terminates, so the
+                # monitoring thread wakes up immediately instead of finishing its sleep.
+                finished = threading.Event()
+
+                # Raised inside the monitoring thread and re-raised after waiting;
+                # the per-call thread fallback cannot propagate through a future.
+                limit_error: Exception | None = None
 
                 # Start a thread to limit the process memory and time usage.
                 def enforce_limits(proc):
+                    nonlocal limit_error
                     try:
                         process = psutil.Process(proc.pid)
-                        while proc.returncode is None:
-                            m = process.memory_full_info()
-                            
-                            if "uss" in m:
-                                # Use USS if available (Linux)
-                                self._max_memory_used = max(
-                                    self._max_memory_used, m.uss / 1024 / 1024
-                                )
-                            else:
-                                # Update max memory used
-                                self._max_memory_used = max(
-                                    self._max_memory_used, m.rss / 1024 / 1024
-                                )
 
-                            if self._max_memory_used > max_memory:
-                                kill_all(process)
-                                raise MemoryExceededError(
-                                    tool, self._max_memory_used, max_memory
-                                )
+                        # Compare raw byte counts in the loop; converting to MB per
+                        # sample costs a float division for nothing.
+                        max_memory_bytes = max_memory * 1024 * 1024
+
+                        status_fd = -1
+                        if sys.platform == "linux":
+                            try:
+                                # Read the kernel's memory accounting directly from /proc,
+                                # which is several times cheaper than going through psutil
+                                # every sample.
+                                status_fd = os.open(f"/proc/{proc.pid}/status", os.O_RDONLY)
+                            except OSError:
+                                status_fd = -1
+
+                        # A pidfd becomes readable the moment the child exits, so the
+                        # monitor can wait on it instead of sleeping out its interval.
+                        pidfd = -1
+                        exited = None
+                        if hasattr(os, "pidfd_open"):
+                            try:
+                                pidfd = os.pidfd_open(proc.pid)
+                                exited = selectors.DefaultSelector()
+                                exited.register(pidfd, selectors.EVENT_READ)
+                            except OSError:
+                                pidfd = -1
+                                exited = None
+
+                        # Adapt the sampling cadence to the tool: start fast so short
+                        # tools get accurate samples, back off while memory is stable
+                        # and drop back down as soon as it changes.
+                        interval = 0.01
+                        stable = 0
+                        prev_rss = -1
+
+                        try:
+                            # poll() checks the process with waitpid(WNOHANG) instead of
+                            # reading a Python attribute that the main thread may not
+                            # have updated yet.
+                            while proc.poll() is None:
+                                # Compare against the current wall time; the previous
+                                # iteration's value lags by a full sampling interval.
+                                elapsed = time.perf_counter() - before
+                                self._time_used = elapsed
+
+                                if status_fd != -1:
+                                    try:
+                                        data = os.pread(status_fd, 4096, 0)
+                                    except OSError:
+                                        # The process already terminated
+                                        break
+
+                                    # VmHWM is the kernel-maintained peak resident set
+                                    # size in kB, so spikes between two samples are
+                                    # never missed.
+                                    start = data.find(b"VmHWM:")
+                                    if start == -1:
+                                        # The process is a zombie and its memory is gone
+                                        break
+                                    end = data.index(b"\n", start)
+                                    rss = int(data[start + 6 : end].split()[0]) * 1024
+                                else:
+                                    with process.oneshot():
+                                        rss = process.memory_info().rss
 
-                            if self._time_used > max_time:
-                                kill_all(process)
-                                raise TimeExceededError(tool, self._time_used, max_time)
-                            self._time_used = time.perf_counter() - before
+                                # Update max memory used
+                                if rss > self._max_rss_bytes:
+                                    self._max_rss_bytes = rss
+
+                                if self._max_rss_bytes > max_memory_bytes:
+                                    kill_all(process)
+                                    raise MemoryExceededError(
+                                        tool, self._max_rss_bytes / (1 << 20), max_memory
+                                    )
+
+                                if elapsed > max_time:
+                                    kill_all(process)
+                                    raise TimeExceededError(tool, elapsed, max_time)
+
+                                if rss == prev_rss:
+                                    stable += 1
+                                    if stable >= 4:
+                                        interval = min(interval * 2, 0.2)
+                                else:
+                                    stable = 0
+                                    interval = 0.01
+                                prev_rss = rss
+
+                                if exited is not None:
+                                    if exited.select(timeout=interval):
+                                        break
+                                else:
+                                    finished.wait(interval)
+                        finally:
+                            if exited is not None:
+                                exited.close()
+                            if pidfd != -1:
+                                os.close(pidfd)
+                            if status_fd != -1:
+                                os.close(status_fd)
 
                     except psutil.NoSuchProcess as _:
                         # The tool finished before we could acquire the pid
                         None  # type: ignore
-
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(enforce_limits, proc)
-
-                    # Process the output while the process is running
-                    if proc.stdout:
-                        for line in proc.stdout:
-                            if read_stdout:
-                                read_stdout(line.rstrip("\n"))
-                    
-                    # EOF was reached, wait for process to terminate (without this the returncode is never set)
-                    proc.wait()
-
-                    # Wait for the limit enforcement thread to finish
-                    future.result()
+                    except (
+                        MemoryExceededError,
+                        TimeExceededError,
+                        ToolRuntimeError,
+                    ) as e:
+                        limit_error = e
+
+                wait_monitor = self._start_monitor(enforce_limits, proc)
+
+                # Process the output while the process is running. One 64 KB read
+                # replaces thousands of line reads, and splitting happens in C.
+                if proc.stdout:
+                    buffer = bytearray()
+                    # read1 returns as soon as any data is available, so lines still
+                    # reach the callback while the process is running; read() would
+                    # block until a full 64 KB accumulated or the process exited.
+                    while chunk := proc.stdout.read1(65536):
+                        buffer += chunk
+                        if b"\n" in chunk:
+                            lines = buffer.split(b"\n")
+                            buffer = bytearray(lines.pop())
+                            for line in lines:
+                                # Splitting already dropped the newline; a slice is
+                                # all that is needed to also handle \r\n endings.
+                                if line.endswith(b"\r"):
+                                    line = line[:-1]
+                                read_stdout(line.decode())
+                    if buffer:
+                        # The last line of the output has no trailing newline
+                        read_stdout(buffer.decode())
+
+                # EOF was reached, wait for process to terminate (without this the returncode is never set)
+                proc.wait()
+
+                # Wake up the limit enforcement thread and wait for it to finish
+                finished.set()
+                wait_monitor()
+
+                if limit_error is not None:
+                    raise limit_error
 
                 # Measure the real time since its the most accurate
                 self._time_used = time.perf_counter() - before
 
+                # The kernel killed the tool for exceeding its CPU-time budget
+                # (SIGXCPU does not exist on Windows)
+                if hasattr(signal, "SIGXCPU") and proc.returncode == -signal.SIGXCPU:
+                    raise TimeExceededError(tool, self._time_used, max_time)
+
                 if proc.returncode != 0:
                     raise ToolRuntimeError(
                         f"Tool {tool} {arguments} ended with return code {proc.returncode}"
@@ -116,7 +340,7 @@ class RunProcess:
     @property
     def max_memory(self):
         """Returns the maximum resident set memory used by the process in MB."""
-        return self._max_memory_used
+        return self._max_rss_bytes / (1 << 20)
 
 
 class TimeExceededError(Exception):
@@ -156,16 +380,28 @@ class ToolRuntimeError(Exception):
 
 
 def kill_all(process):
-    """Kill a process tree (including grandchildren) with signal
-    "sig" and return a (gone, still_alive) tuple.
+    """Kill a process tree (including grandchildren) and wait until every
+    process in it is gone.
     """
-    children = process.children(recursive=True)
-    children.append(process)
-
-    for p in children:
+    if hasattr(os, "killpg"):
         try:
-            p.kill()
-        except psutil.NoSuchProcess:
+            # The tool leads its own process group (start_new_session), so one
+            # signal kills the entire tree instead of one kill per process.
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            # The process group is already gone
             pass
-    _, alive = psutil.wait_procs(children)
-    assert not alive
+        _, alive = psutil.wait_procs([process], timeout=5)
+    else:
+        children = process.children(recursive=True)
+        children.append(process)
+
+        for p in children:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+        _, alive = psutil.wait_procs(children, timeout=5)
+
+    if alive:
+        raise ToolRuntimeError(f"Failed to kill process {process.pid} and its children")
@@ -4,7 +4,7 @@
 import unittest
 import sys
 
-from merc import RunProcess, TimeExceededError
+from merc import RunProcess, TimeExceededError, MemoryExceededError, ToolRuntimeError
 
 class TestRunProcess(unittest.TestCase):
 
@@ -12,6 +12,24 @@ class TestRunProcess(unittest.TestCase):
         # Check that a process exceeding the time limit raises TimeExceededError
         self.assertRaises(TimeExceededError, RunProcess, sys.executable, ["-c", "import time; time.sleep(2)"], max_time=1)
 
+    def test_memory_limit(self):
+        # Check that a process exceeding the memory limit raises MemoryExceededError
+        self.assertRaises(MemoryExceededError, RunProcess, sys.executable, ["-c", "import time; x = bytearray(300 * 1024 * 1024); time.sleep(5)"], max_memory=100)
+
+    def test_returncode(self):
+        # Check that a failing process raises ToolRuntimeError, also on the fast
+        # path taken when no callback or limits are given
+        self.assertRaises(ToolRuntimeError, RunProcess, sys.executable, ["-c", "import sys; sys.exit(1)"])
+
+    def test_fast_path_user_time(self):
+        # Check that the fast path without callback or limits still measures time
+        result = RunProcess(sys.executable, ["-c", "pass"])
+        self.assertGreater(result.user_time, 0)
+
+    def test_no_callback(self):
+        # Check that output is discarded cleanly when no callback is given
+        RunProcess(sys.executable, ["-c", "for i in range(1000): print(i)"], max_time=10)
+
     def test_printing(self):
         output_lines = []
 
@@ -25,6 +43,15 @@ class TestRunProcess(unittest.TestCase):
         expected_lines = [str(i) for i in range(5)]
         self.assertEqual(output_lines, expected_lines)
 
+    def test_crlf_lines(self):
+        output_lines = []
+
+        # Run a process that writes \r\n line endings; the callback should
+        # receive the lines without the carriage return, like universal newlines
+        RunProcess(sys.executable, ["-c", "import sys; sys.stdout.buffer.write(b'a\\r\\nb\\nc')"], read_stdout=output_lines.append)
+
+        self.assertEqual(output_lines, ["a", "b", "c"])
+
     def test_large_output(self):
         output_lines = []
 